@@ -1,4 +1,8 @@
+import argparse
+import logging
 import os
+from collections import OrderedDict
+from functools import lru_cache
 
 import gradio as gr
 from dotenv import load_dotenv
@@ -7,10 +11,11 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-load_dotenv()
-
-gemini_key = os.getenv("GEMINI_API_KEY")
+logger = logging.getLogger(__name__)
 
+# The system prompt is the stable prefix Gemini can cache across calls. Keep it
+# static: route any per-request context (memory, retrieval) through a separate
+# message after it or the history placeholder, never by interpolating here.
 system_prompt = """
     You are Einstein.
     Answer questions through Einstein's questioning and reasoning...
@@ -22,10 +27,6 @@ system_prompt = """
     You should also keep your answers brief, less than 300 characters.
 """
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", google_api_key=gemini_key, temperature=0.5
-)
-
 prompt = ChatPromptTemplate.from_messages(
     [
         ("system", system_prompt),
@@ -34,57 +35,223 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-chain = prompt | llm | StrOutputParser()
 
+@lru_cache(maxsize=1)
+def get_llm():
+    load_dotenv()
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+        temperature=0.5,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_chain():
+    return prompt | get_llm() | StrOutputParser()
+
+
+def __getattr__(name):
+    # Keep main.llm / main.chain available without building them on import.
+    if name == "llm":
+        return get_llm()
+    if name == "chain":
+        return get_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_MSG_CTORS = {"user": HumanMessage, "assistant": AIMessage}
+
+# Only the most recent turns are sent to Gemini so per-call input tokens stay
+# bounded no matter how long the conversation runs.
+MAX_TURNS = 12
+
+# Repeated questions are answered from memory instead of calling Gemini again.
+# The key includes the last few turns so answers don't leak across conversations.
+RESPONSE_CACHE_SIZE = 256
+CACHE_CONTEXT_TURNS = 3
+
+_response_cache: OrderedDict[tuple, str] = OrderedDict()
 
-def chat(user_input, history):
-    langchain_history = []
-    for item in history:
-        if item["role"] == "user":
-            langchain_history.append(HumanMessage(content=item["content"]))
-        elif item["role"] == "assistant":
-            langchain_history.append(AIMessage(content=item["content"]))
+BLANK_INPUT_MESSAGE = "Ask me something, or don't waste my time."
 
-    response = chain.invoke({"input": user_input, "history": langchain_history})
 
+@lru_cache(maxsize=1024)
+def _to_langchain_message(role, content):
+    # Past turns are resent on every call, so reuse their message objects.
+    # Content comes from our own session state, so skip pydantic validation.
+    return _MSG_CTORS[role].model_construct(content=content)
+
+
+def _message_text(content):
+    # Gradio 6 hands history content over as a list of typed parts.
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part["text"]
+        for part in content
+        if isinstance(part, dict) and part.get("type") == "text"
+    )
+
+
+def _to_langchain_history(history):
+    start = -2 * MAX_TURNS
+    trimmed = history[start:]
+    texts = [(item["role"], _message_text(item["content"])) for item in trimmed]
+    return [
+        _to_langchain_message(role, text)
+        for role, text in texts
+        if role in _MSG_CTORS and text.strip()
+    ]
+
+
+def _cache_key(user_input, history):
+    start = -2 * CACHE_CONTEXT_TURNS
+    tail = history[start:] if CACHE_CONTEXT_TURNS else []
     return (
-        "",
-        history
-        + [
-            {"role": "user", "content": user_input},
-            {"role": "assistant", "content": response},
-        ],
+        " ".join(user_input.lower().split()),
+        tuple((item["role"], _message_text(item["content"])) for item in tail),
     )
 
 
-page = gr.Blocks(title="Chat with Mean Einstein", theme=gr.themes.Soft())
+def _store_response(key, response):
+    _response_cache[key] = response
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+def _forget_last_response(history):
+    # Retry re-asks the last question with the same history, which would
+    # otherwise be answered straight from the cache.
+    user_turns = [i for i, item in enumerate(history) if item["role"] == "user"]
+    if not user_turns:
+        return
+    last = user_turns[-1]
+    user_input = _message_text(history[last]["content"])
+    _response_cache.pop(_cache_key(user_input, history[:last]), None)
+
+
+async def chat(user_input, history):
+    # gr.ChatInterface owns the history, so only the growing reply is yielded;
+    # the queue streams it to the browser as a diff. ChatInterface still copies
+    # the history server-side on every chunk.
+    if not user_input or not user_input.strip():
+        raise gr.Error(BLANK_INPUT_MESSAGE)
+
+    key = _cache_key(user_input, history)
+    if key in _response_cache:
+        _response_cache.move_to_end(key)
+        yield _response_cache[key]
+        return
+
+    langchain_history = _to_langchain_history(history)
+
+    response = ""
+    async for chunk in get_chain().astream(
+        {"input": user_input, "history": langchain_history}
+    ):
+        response += chunk
+        yield response
+
+    if response:
+        _store_response(key, response)
+
+
+BATCH_CONCURRENCY = 16
+
+
+def batch_chat(user_inputs, histories=None):
+    # Non-interactive path for evaluation and replay: no UI, no streaming.
+    # A failed call comes back as its exception so the other answers survive.
+    if histories is None:
+        histories = [[] for _ in user_inputs]
+    inputs = [
+        {"input": user_input, "history": _to_langchain_history(history)}
+        for user_input, history in zip(user_inputs, histories, strict=True)
+    ]
+    return get_chain().batch(
+        inputs,
+        config={"max_concurrency": BATCH_CONCURRENCY},
+        return_exceptions=True,
+    )
+
+
+# Gemini calls are network-bound, so a handful can be in flight at once while
+# the queue applies backpressure to everyone else.
+CONCURRENCY_LIMIT = 8
+QUEUE_MAX_SIZE = 64
+
+
+def _validate_input(message):
+    # Rejecting blank input here stops ChatInterface from recording the turn.
+    return gr.validate(bool(message and message.strip()), BLANK_INPUT_MESSAGE)
 
 
 def clear_chat():
-    return "", []
+    return "", [], []
 
 
-if __name__ == "__main__":
-    print("Hi, I am Albert, how can I help you today?")
+with gr.Blocks(title="Chat with Mean Einstein") as page:
+    gr.Markdown(
+        """
+        # Chat with Einstein!
+        He's smart, and he's mean. Ask him anything!
+        Welcome to your personal conversation with Albert Einstein!
+        """
+    )
+
+    chatbot = gr.Chatbot(
+        avatar_images=(None, "einstein.png"),
+        show_label=False,
+        render=False,
+    )
+
+    msg = gr.Textbox(
+        show_label=False, placeholder="Ask Einstein Anything", render=False
+    )
 
-    with page:
-        gr.Markdown(
-            """
-            # Chat with Einstein!
-            He's smart, and he's mean. Ask him anything!
-            Welcome to your personal conversation with Albert Einstein!
-            """
-        )
+    chat_interface = gr.ChatInterface(
+        fn=chat,
+        chatbot=chatbot,
+        textbox=msg,
+        concurrency_limit=CONCURRENCY_LIMIT,
+        validator=_validate_input,
+    )
+
+    chatbot.retry(
+        _forget_last_response, chatbot, None, queue=False, api_visibility="private"
+    )
 
-        chatbot = gr.Chatbot(
-            type="messages", avatar_images=(None, "einstein.png"), show_label=False
-        )
+    clear = gr.Button("Clear Chat", variant="secondary")
+    # ChatInterface hands chat() its own copy of the history, so reset that too
+    # or the cleared conversation comes back on the next message.
+    clear.click(clear_chat, outputs=[msg, chatbot, chat_interface.chatbot_state])
 
-        msg = gr.Textbox(show_label=False, placeholder="Ask Einstein Anything")
 
-        msg.submit(chat, [msg, chatbot], [msg, chatbot])
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat with Mean Einstein")
+    subcommands = parser.add_subparsers(dest="command")
+    batch_parser = subcommands.add_parser(
+        "batch", help="Answer each line of a file as a separate question, no UI"
+    )
+    batch_parser.add_argument("questions", type=argparse.FileType("r"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
 
-        clear = gr.Button("Clear Chat", variant="Secondary")
-        clear.click(clear_chat, outputs=[msg, chatbot])
+    if args.command == "batch":
+        with args.questions as questions_file:
+            questions = [line.strip() for line in questions_file if line.strip()]
+        for question, answer in zip(questions, batch_chat(questions)):
+            if isinstance(answer, Exception):
+                print(f"Q: {question}\nError: {answer}\n")
+            else:
+                print(f"Q: {question}\nA: {answer}\n")
+    else:
+        logger.info("Hi, I am Albert, how can I help you today?")
 
-    page.launch(share=True)
+        page.queue(
+            default_concurrency_limit=CONCURRENCY_LIMIT, max_size=QUEUE_MAX_SIZE
+        ).launch(share=True, theme=gr.themes.Soft())
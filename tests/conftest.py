@@ -5,24 +5,30 @@ Shared pytest fixtures for AI Assistant Einstein tests.
 import os
 import sys
 import pytest
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import patch
 
 # Add parent directory to path before any imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
-# Mock the LangChain Google GenAI at the module level before importing main
-@pytest.fixture(scope="session", autouse=True)
-def mock_langchain_imports():
-    """Mock LangChain components to avoid API calls during tests."""
-    with patch("langchain_google_genai.ChatGoogleGenerativeAI") as mock_llm:
-        # Configure the mock to return a mock LLM instance
-        mock_llm_instance = MagicMock()
-        mock_llm.return_value = mock_llm_instance
-        yield mock_llm
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, AIMessage
 
 
-from langchain_core.messages import HumanMessage, AIMessage
+# main builds the Gemini client lazily, so only tests that build the chain
+# need this; opt in with @pytest.mark.usefixtures("mock_langchain_imports").
+@pytest.fixture
+def mock_langchain_imports():
+    """Mock the Gemini client so building the chain makes no API calls."""
+    import main
+
+    main.get_llm.cache_clear()
+    main.get_chain.cache_clear()
+    with patch("main.ChatGoogleGenerativeAI") as mock_llm:
+        mock_llm.return_value = FakeListChatModel(responses=["Mocked Einstein"])
+        yield mock_llm
+    main.get_llm.cache_clear()
+    main.get_chain.cache_clear()
 
 
 @pytest.fixture
@@ -68,9 +74,16 @@ def mock_llm_response():
 
 @pytest.fixture
 def mock_chain(mocker, mock_llm_response):
-    """Mock the LangChain chain to avoid real API calls."""
+    """Mock the LangChain chain that main.get_chain() hands to chat()."""
     mock = mocker.Mock()
     mock.invoke.return_value = mock_llm_response
+    mock.batch.side_effect = lambda inputs, **kwargs: [mock_llm_response] * len(inputs)
+
+    async def _astream(*args, **kwargs):
+        yield mock_llm_response
+
+    mock.astream.side_effect = _astream
+    mocker.patch("main.get_chain", return_value=mock)
     return mock
 
 
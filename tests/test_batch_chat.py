@@ -0,0 +1,108 @@
+"""
+Unit tests for the batch_chat() function.
+
+These tests use mocking to avoid real API calls to Google Gemini.
+"""
+
+import pytest
+from unittest.mock import patch
+
+# Import after conftest has set up mocks
+import main
+from main import batch_chat
+
+
+@pytest.mark.unit
+def test_batch_chat_returns_one_answer_per_input():
+    """Test that batch_chat returns the chain's answers in input order."""
+    # Arrange
+    user_inputs = ["What is relativity?", "Why is the sky blue?"]
+    mock_responses = ["Ask a harder one.", "Rayleigh, not me."]
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.batch.return_value = mock_responses
+
+        # Act
+        result = batch_chat(user_inputs)
+
+        # Assert
+        assert result == mock_responses, "Answers should match chain output"
+        mock_chain_obj.batch.assert_called_once()
+        inputs = mock_chain_obj.batch.call_args[0][0]
+        assert [item["input"] for item in inputs] == user_inputs
+        assert all(
+            item["history"] == [] for item in inputs
+        ), "Inputs without histories should start fresh conversations"
+
+
+@pytest.mark.unit
+def test_batch_chat_converts_histories(sample_history):
+    """Test that per-input histories are converted to LangChain messages."""
+    # Arrange
+    from langchain_core.messages import HumanMessage, AIMessage
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.batch.return_value = ["Fine."]
+
+        # Act
+        batch_chat(["Tell me more"], [sample_history])
+
+        # Assert
+        history = mock_chain_obj.batch.call_args[0][0][0]["history"]
+        assert len(history) == 4, "All history turns should be converted"
+        assert isinstance(history[0], HumanMessage)
+        assert isinstance(history[1], AIMessage)
+
+
+@pytest.mark.unit
+def test_batch_chat_limits_concurrency():
+    """Test that batch_chat caps the number of in-flight requests."""
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.batch.return_value = ["Hmph."]
+
+        # Act
+        batch_chat(["Hello"])
+
+        # Assert
+        config = mock_chain_obj.batch.call_args[1]["config"]
+        assert config["max_concurrency"] == main.BATCH_CONCURRENCY
+
+
+@pytest.mark.unit
+def test_batch_chat_rejects_mismatched_histories():
+    """Test that batch_chat refuses inputs and histories of different lengths."""
+    with patch("main.get_chain"):
+        with pytest.raises(ValueError):
+            batch_chat(["One", "Two"], [[]])
+
+
+@pytest.mark.unit
+def test_batch_chat_with_mock_chain_fixture(mock_chain, mock_llm_response):
+    """Test that the shared mock_chain fixture is what batch_chat() calls."""
+    # Act
+    result = batch_chat(["One", "Two"])
+
+    # Assert
+    assert result == [mock_llm_response, mock_llm_response]
+    mock_chain.batch.assert_called_once()
+
+
+@pytest.mark.unit
+def test_batch_chat_keeps_answers_when_one_call_fails():
+    """Test that one failed Gemini call doesn't discard the other answers."""
+    # Arrange
+    failure = RuntimeError("quota exceeded")
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.batch.return_value = ["Fine.", failure]
+
+        # Act
+        result = batch_chat(["One", "Two"])
+
+        # Assert
+        assert result == ["Fine.", failure], "Failures should come back in place"
+        assert mock_chain_obj.batch.call_args[1]["return_exceptions"] is True
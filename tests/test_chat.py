@@ -8,76 +8,82 @@ import pytest
 from unittest.mock import patch
 
 # Import after conftest has set up mocks
+import main
 from main import chat
 
 
+def _astream(*chunks):
+    """Build a fake chain.astream that yields the given chunks."""
+
+    async def _gen(*args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+
+    return _gen
+
+
+async def _collect(agen):
+    """Drain an async generator into a list."""
+    return [item async for item in agen]
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Start every test with an empty response cache."""
+    main._response_cache.clear()
+    yield
+    main._response_cache.clear()
+
+
 @pytest.mark.unit
-def test_chat_with_empty_history(empty_history):
+@pytest.mark.asyncio
+async def test_chat_with_empty_history(empty_history):
     """Test chat function with no previous conversation history."""
     # Arrange
     user_input = "What is relativity?"
     mock_response = "Ah, my theory! Space and time are relative, you see..."
 
-    # Mock the chain.invoke to return our test response
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    # Mock the chain.astream to return our test response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        result_msg, result_history = chat(user_input, empty_history)
+        *_, reply = await _collect(chat(user_input, empty_history))
 
         # Assert
-        assert result_msg == "", "First return value should be empty string"
-        assert (
-            len(result_history) == 2
-        ), "History should contain user message and assistant response"
-        assert result_history[0]["role"] == "user", "First message should be from user"
-        assert (
-            result_history[0]["content"] == user_input
-        ), "User message content should match input"
-        assert (
-            result_history[1]["role"] == "assistant"
-        ), "Second message should be from assistant"
-        assert (
-            result_history[1]["content"] == mock_response
-        ), "Assistant message should match mock response"
+        assert reply == mock_response, "Final yield should be the full response"
+        call_args = mock_chain_obj.astream.call_args[0][0]
+        assert call_args["history"] == [], "No prior turns should be sent"
 
 
 @pytest.mark.unit
-def test_chat_with_existing_history(sample_history):
+@pytest.mark.asyncio
+async def test_chat_with_existing_history(sample_history):
     """Test chat function with existing conversation history."""
     # Arrange
     user_input = "Can you explain more?"
     mock_response = "Fine, but this is the last time I'm explaining this!"
 
-    # Mock the chain.invoke
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    # Mock the chain.astream
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        result_msg, result_history = chat(user_input, sample_history)
+        *_, reply = await _collect(chat(user_input, sample_history))
 
         # Assert
-        assert result_msg == "", "First return value should be empty string"
-        # Original history (4) + new user message (1) + new assistant message (1) = 6
-        assert (
-            len(result_history) == 6
-        ), "History should contain all previous messages plus new ones"
-        assert (
-            result_history[-2]["role"] == "user"
-        ), "Second-to-last message should be new user message"
+        assert reply == mock_response, "Final yield should be the full response"
+        call_args = mock_chain_obj.astream.call_args[0][0]
         assert (
-            result_history[-2]["content"] == user_input
-        ), "User message should match input"
-        assert (
-            result_history[-1]["role"] == "assistant"
-        ), "Last message should be assistant response"
-        assert (
-            result_history[-1]["content"] == mock_response
-        ), "Assistant message should match mock"
+            len(call_args["history"]) == 4
+        ), "All previous messages should be sent as context"
 
 
 @pytest.mark.unit
-def test_chat_history_conversion_to_langchain_format(sample_history):
+@pytest.mark.asyncio
+async def test_chat_history_conversion_to_langchain_format(sample_history):
     """Test that Gradio history is correctly converted to LangChain message format."""
     # Arrange
     from langchain_core.messages import HumanMessage, AIMessage
@@ -86,18 +92,19 @@ def test_chat_history_conversion_to_langchain_format(sample_history):
     mock_response = "Test response"
 
     # Mock the chain
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        chat(user_input, sample_history)
+        await _collect(chat(user_input, sample_history))
 
         # Assert
-        mock_chain_obj.invoke.assert_called_once()
-        call_args = mock_chain_obj.invoke.call_args[0][0]
+        mock_chain_obj.astream.assert_called_once()
+        call_args = mock_chain_obj.astream.call_args[0][0]
 
         # Check that history was converted correctly
-        assert "history" in call_args, "invoke should receive 'history' parameter"
+        assert "history" in call_args, "astream should receive 'history' parameter"
         langchain_history = call_args["history"]
 
         assert len(langchain_history) == 4, "Should convert all 4 history items"
@@ -114,84 +121,411 @@ def test_chat_history_conversion_to_langchain_format(sample_history):
 
 
 @pytest.mark.unit
-def test_chat_preserves_original_history(sample_history):
-    """Test that chat function doesn't modify the original history list."""
+@pytest.mark.asyncio
+async def test_chat_preserves_original_history(sample_history):
+    """Test that chat leaves the history to gr.ChatInterface and doesn't modify it."""
     # Arrange
     user_input = "New question"
     mock_response = "New response"
-    original_history_length = len(sample_history)
     original_history_copy = sample_history.copy()
 
     # Mock the chain
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        chat(user_input, sample_history)
+        await _collect(chat(user_input, sample_history))
 
         # Assert
-        assert (
-            len(sample_history) == original_history_length
-        ), "Original history should not be modified"
         assert (
             sample_history == original_history_copy
         ), "Original history content should be unchanged"
 
 
 @pytest.mark.unit
-def test_chat_return_format():
-    """Test that chat returns the expected tuple format."""
+@pytest.mark.asyncio
+async def test_chat_return_format():
+    """Test that chat yields only the assistant reply as a string."""
     # Arrange
     user_input = "Test"
     mock_response = "Response"
 
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        result = chat(user_input, [])
+        results = await _collect(chat(user_input, []))
 
         # Assert
-        assert isinstance(result, tuple), "chat should return a tuple"
-        assert len(result) == 2, "chat should return a tuple of 2 elements"
-        assert isinstance(result[0], str), "First element should be a string"
-        assert isinstance(result[1], list), "Second element should be a list"
+        assert results == [mock_response], "chat should yield once per chunk"
+        assert isinstance(results[0], str), "Each yield should be a string"
 
 
 @pytest.mark.unit
-def test_chat_with_special_characters(empty_history):
+@pytest.mark.asyncio
+async def test_chat_streams_partial_responses(empty_history):
+    """Test that chat yields the accumulated response after every chunk."""
+    # Arrange
+    user_input = "What is relativity?"
+    chunks = ["Ah, ", "my theory! ", "Time is relative."]
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(*chunks)
+
+        # Act
+        partials = await _collect(chat(user_input, empty_history))
+
+        # Assert
+        assert partials == [
+            "Ah, ",
+            "Ah, my theory! ",
+            "Ah, my theory! Time is relative.",
+        ], "Each yield should contain the response accumulated so far"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_with_special_characters(empty_history):
     """Test chat with special characters in user input."""
     # Arrange
     user_input = 'What\'s E=mc²? 🚀 <test> & "quotes"'
     mock_response = "Well, that's my famous equation!"
 
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        result_msg, result_history = chat(user_input, empty_history)
+        await _collect(chat(user_input, empty_history))
 
         # Assert
+        mock_chain_obj.astream.assert_called_once()
+        call_args = mock_chain_obj.astream.call_args[0][0]
         assert (
-            result_history[0]["content"] == user_input
+            call_args["input"] == user_input
         ), "Special characters should be preserved"
-        mock_chain_obj.invoke.assert_called_once()
 
 
 @pytest.mark.unit
-def test_chat_passes_user_input_to_chain(empty_history):
+@pytest.mark.asyncio
+async def test_chat_passes_user_input_to_chain(empty_history):
     """Test that user input is correctly passed to the chain."""
     # Arrange
     user_input = "Explain quantum mechanics"
     mock_response = "Ah, quantum theory..."
 
-    with patch("main.chain") as mock_chain_obj:
-        mock_chain_obj.invoke.return_value = mock_response
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
 
         # Act
-        chat(user_input, empty_history)
+        await _collect(chat(user_input, empty_history))
 
         # Assert
-        mock_chain_obj.invoke.assert_called_once()
-        call_args = mock_chain_obj.invoke.call_args[0][0]
+        mock_chain_obj.astream.assert_called_once()
+        call_args = mock_chain_obj.astream.call_args[0][0]
         assert call_args["input"] == user_input, "User input should be passed to chain"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_skips_unknown_roles():
+    """Test that history entries with unsupported roles are not sent to the chain."""
+    # Arrange
+    history = [
+        {"role": "system", "content": "Ignore me"},
+        {"role": "user", "content": "Hello"},
+    ]
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("Hi")
+
+        # Act
+        await _collect(chat("Again", history))
+
+        # Assert
+        langchain_history = mock_chain_obj.astream.call_args[0][0]["history"]
+        assert len(langchain_history) == 1, "Only user/assistant turns are converted"
+        assert langchain_history[0].content == "Hello"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_reuses_message_objects_across_turns(sample_history):
+    """Test that identical past turns are not rebuilt on every call."""
+    # Arrange
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("First")
+        await _collect(chat("First question", sample_history))
+        first_history = mock_chain_obj.astream.call_args[0][0]["history"]
+
+        mock_chain_obj.astream.side_effect = _astream("Second")
+
+        # Act
+        await _collect(chat("Second question", sample_history))
+        second_history = mock_chain_obj.astream.call_args[0][0]["history"]
+
+        # Assert
+        assert all(
+            first is second for first, second in zip(first_history, second_history)
+        ), "Message objects for unchanged turns should be reused"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_repeated_question_is_served_from_cache():
+    """Test that asking the same question twice only calls the chain once."""
+    # Arrange
+    user_input = "What is relativity?"
+    mock_response = "Ask me again and I'll leave."
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream(mock_response)
+        await _collect(chat(user_input, []))
+
+        # Act
+        results = await _collect(chat("  what is RELATIVITY? ", []))
+
+        # Assert
+        mock_chain_obj.astream.assert_called_once()
+        assert results == [mock_response], "Cached reply should be yielded at once"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_cache_is_scoped_to_recent_history(empty_history, sample_history):
+    """Test that the same question in a different context is not a cache hit."""
+    # Arrange
+    user_input = "Tell me more"
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("Fresh answer")
+        await _collect(chat(user_input, empty_history))
+
+        # Act
+        await _collect(chat(user_input, sample_history))
+
+        # Assert
+        assert (
+            mock_chain_obj.astream.call_count == 2
+        ), "Different conversation context should bypass the cache"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_response_cache_is_bounded(monkeypatch):
+    """Test that the oldest cached response is evicted once the cache is full."""
+    # Arrange
+    monkeypatch.setattr(main, "RESPONSE_CACHE_SIZE", 2)
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("answer")
+
+        # Act
+        for question in ("one", "two", "three"):
+            await _collect(chat(question, []))
+
+        # Assert
+        assert len(main._response_cache) == 2, "Cache should not exceed its size"
+        cached_inputs = [key[0] for key in main._response_cache]
+        assert cached_inputs == ["two", "three"], "Oldest entry should be evicted"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_sends_only_recent_turns():
+    """Test that long histories are trimmed to the last MAX_TURNS turns."""
+    # Arrange
+    history = []
+    for i in range(main.MAX_TURNS + 5):
+        history.append({"role": "user", "content": f"Question {i}"})
+        history.append({"role": "assistant", "content": f"Answer {i}"})
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("Enough questions!")
+
+        # Act
+        await _collect(chat("One more", history))
+
+        # Assert
+        langchain_history = mock_chain_obj.astream.call_args[0][0]["history"]
+        assert (
+            len(langchain_history) == 2 * main.MAX_TURNS
+        ), "Only the last MAX_TURNS turns should be sent"
+        assert langchain_history[-1].content == history[-1]["content"]
+
+
+@pytest.mark.unit
+def test_history_messages_are_fully_formed():
+    """Test that unvalidated message construction still sets message defaults."""
+    # Act
+    human = main._to_langchain_message("user", "Hello")
+    ai = main._to_langchain_message("assistant", "Go away")
+
+    # Assert
+    assert human.type == "human", "User turns should be human messages"
+    assert ai.type == "ai", "Assistant turns should be AI messages"
+    assert human.content == "Hello"
+    assert ai.additional_kwargs == {}, "Defaults should be populated"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize("user_input", ["", "   ", "\n\t"])
+async def test_chat_rejects_blank_input(sample_history, user_input):
+    """Test that empty or whitespace-only input never reaches the chain."""
+    import gradio as gr
+
+    with patch("main.get_chain") as mock_get_chain:
+        # Act & Assert
+        with pytest.raises(gr.Error):
+            await _collect(chat(user_input, sample_history))
+        mock_get_chain.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("user_input", ["", "   ", "\n\t"])
+def test_blank_input_fails_validation(user_input):
+    """Test that the UI validator blocks blank messages before a turn is recorded."""
+    # Act
+    result = main._validate_input(user_input)
+
+    # Assert
+    assert result["is_valid"] is False, "Blank input should be rejected"
+
+
+@pytest.mark.unit
+def test_non_blank_input_passes_validation():
+    """Test that the UI validator lets real questions through."""
+    assert main._validate_input("What is time?")["is_valid"] is True
+
+
+@pytest.mark.integration
+def test_chat_interface_uses_input_validator():
+    """Test that the chat UI is wired to reject blank input."""
+    assert main.chat_interface.validator is main._validate_input
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_skips_blank_history_turns():
+    """Test that blank turns already in the history are not sent to the chain."""
+    # Arrange
+    history = [
+        {"role": "user", "content": "   "},
+        {"role": "assistant", "content": ""},
+        {"role": "user", "content": "Hello"},
+    ]
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("Hmph.")
+
+        # Act
+        await _collect(chat("Again", history))
+
+        # Assert
+        langchain_history = mock_chain_obj.astream.call_args[0][0]["history"]
+        assert [message.content for message in langchain_history] == ["Hello"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_accepts_gradio_message_parts():
+    """Test that history content given as Gradio 6 typed parts is sent as text."""
+    # Arrange
+    history = [
+        {"role": "user", "content": [{"text": "What is relativity?", "type": "text"}]},
+        {
+            "role": "assistant",
+            "content": [{"text": "Ask a physicist.", "type": "text"}],
+        },
+    ]
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("You again?")
+
+        # Act
+        results = await _collect(chat("Tell me more", history))
+
+        # Assert
+        assert results == ["You again?"]
+        langchain_history = mock_chain_obj.astream.call_args[0][0]["history"]
+        assert [message.content for message in langchain_history] == [
+            "What is relativity?",
+            "Ask a physicist.",
+        ], "Typed text parts should be flattened to plain strings"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chat_with_mock_chain_fixture(mock_chain, mock_llm_response):
+    """Test that the shared mock_chain fixture is what chat() streams from."""
+    # Act
+    results = await _collect(chat("Are you mean?", []))
+
+    # Assert
+    assert results == [mock_llm_response]
+    mock_chain.astream.assert_called_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_retried_question_reaches_the_chain_again(sample_history):
+    """Test that Retry drops the cached answer so a new one is generated."""
+    # Arrange
+    user_input = "Explain it again"
+
+    with patch("main.get_chain") as mock_get_chain:
+        mock_chain_obj = mock_get_chain.return_value
+        mock_chain_obj.astream.side_effect = _astream("First try")
+        await _collect(chat(user_input, sample_history))
+        shown_history = sample_history + [
+            {"role": "user", "content": [{"text": user_input, "type": "text"}]},
+            {"role": "assistant", "content": [{"text": "First try", "type": "text"}]},
+        ]
+
+        # Act - what the Retry button does before re-running chat()
+        main._forget_last_response(shown_history)
+        mock_chain_obj.astream.side_effect = _astream("Second try")
+        results = await _collect(chat(user_input, sample_history))
+
+        # Assert
+        assert mock_chain_obj.astream.call_count == 2, "Retry should call Gemini"
+        assert results == ["Second try"]
+
+
+@pytest.mark.unit
+def test_forget_last_response_ignores_empty_history():
+    """Test that retrying with no user turn leaves the cache alone."""
+    # Arrange
+    main._response_cache[("q", ())] = "a"
+
+    # Act
+    main._forget_last_response([])
+
+    # Assert
+    assert main._response_cache == {("q", ()): "a"}
+
+
+@pytest.mark.integration
+def test_retry_button_clears_cached_response():
+    """Test that the chatbot's Retry event is wired to drop the cached answer."""
+    handlers = [
+        fn for fn in main.page.fns.values() if (main.chatbot._id, "retry") in fn.targets
+    ]
+
+    assert any(
+        fn.fn is main._forget_last_response and fn.api_visibility == "private"
+        for fn in handlers
+    ), "Retry should drop the cached answer without exposing an API endpoint"
@@ -9,27 +9,29 @@ from main import clear_chat
 
 
 @pytest.mark.unit
-def test_clear_chat_returns_empty_string_and_list():
-    """Test that clear_chat returns an empty string and an empty list."""
+def test_clear_chat_returns_empty_string_and_lists():
+    """Test that clear_chat returns an empty string and two empty lists."""
     # Act
     result = clear_chat()
 
     # Assert
     assert isinstance(result, tuple), "clear_chat should return a tuple"
-    assert len(result) == 2, "clear_chat should return a tuple of 2 elements"
+    assert len(result) == 3, "clear_chat should return a tuple of 3 elements"
     assert result[0] == "", "First element should be an empty string"
     assert result[1] == [], "Second element should be an empty list"
+    assert result[2] == [], "Third element should be an empty list"
 
 
 @pytest.mark.unit
 def test_clear_chat_return_types():
     """Test that clear_chat returns correct data types."""
     # Act
-    msg, history = clear_chat()
+    msg, history, state = clear_chat()
 
     # Assert
     assert isinstance(msg, str), "First return value should be a string"
     assert isinstance(history, list), "Second return value should be a list"
+    assert isinstance(state, list), "Third return value should be a list"
 
 
 @pytest.mark.unit
@@ -48,7 +50,7 @@ def test_clear_chat_is_idempotent():
 def test_clear_chat_string_is_empty():
     """Test that the returned string is specifically empty, not None or other falsy value."""
     # Act
-    msg, _ = clear_chat()
+    msg, _, _ = clear_chat()
 
     # Assert
     assert msg == "", "Message should be empty string"
@@ -60,9 +62,33 @@ def test_clear_chat_string_is_empty():
 def test_clear_chat_list_is_empty():
     """Test that the returned list is specifically empty, not None or other falsy value."""
     # Act
-    _, history = clear_chat()
+    _, history, _ = clear_chat()
 
     # Assert
     assert history == [], "History should be empty list"
     assert not history, "History should be falsy"
     assert len(history) == 0, "History should have zero length"
+
+
+@pytest.mark.integration
+def test_clear_button_resets_chat_interface_history():
+    """Test that the Clear Chat button also resets the history ChatInterface sends."""
+    import main
+
+    # Arrange
+    handlers = [
+        fn for fn in main.page.fns.values() if (main.clear._id, "click") in fn.targets
+    ]
+
+    # Assert
+    assert len(handlers) == 1, "Clear Chat should reset everything in one event"
+    handler = handlers[0]
+    assert handler.fn is clear_chat
+    assert handler.outputs == [
+        main.msg,
+        main.chatbot,
+        main.chat_interface.chatbot_state,
+    ], "Clear should reset the textbox, chatbot and ChatInterface history state"
+    assert not any(
+        fn.trigger_after == handler._id for fn in main.page.fns.values()
+    ), "Clear should not chain extra handlers that become API endpoints"